@@ -1,50 +1,580 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
-import uuid
+import secrets
+import json
+import time
 import os
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from numba import njit
 
-# Define the CSV file path
+# Loans are stored as Parquet; the CSV file is only read to migrate old data
+LOANS_PARQUET_PATH = "loans_database.parquet"
 LOANS_CSV_PATH = "loans_database.csv"
 
+# Newly added loans are appended as small Parquet part files in this directory;
+# the next full rewrite of LOANS_PARQUET_PATH folds them in and removes them
+LOANS_APPEND_DIR = "loans_database_appends"
+
+# Schema metadata key listing the part files a rewrite folded in, so parts left
+# behind by an interrupted cleanup are never loaded a second time
+FOLDED_PARTS_KEY = b"folded_parts"
+
+# Columns written to disk; dates are stored as int32 days since EPOCH and the
+# ISO date strings and *_dt datetime columns are derived on load
+STORED_COLUMNS = [
+    "id", "person", "amount", "rate", "start_epoch",
+    "end_epoch", "days", "interest", "total"
+]
+
+# Columns derived from the stored epoch days
+DATE_COLUMNS = ["start_date", "end_date", "start_date_dt", "end_date_dt"]
+
+EPOCH = pd.Timestamp("1970-01-01")
+
+# Use only the columns we need for display
+DISPLAY_COLUMNS = [
+    "person", "amount", "rate", "start_date", 
+    "end_date", "days", "interest", "total"
+]
+
+# Columns the user can change in the loans grid; the rest are derived
+EDITABLE_COLUMNS = ["person", "amount", "rate", "start_date", "end_date"]
+
 def calculate_interest(amount, rate, start_date, end_date):
     """Calculate interest for a given amount, rate, and time period."""
     time_period = (end_date - start_date).days
     monthly_interest = (amount * rate / 100) * (time_period / 30)
     return round(monthly_interest, 2), time_period
 
-def load_loans_from_csv():
-    """Load loans from CSV file if it exists."""
-    if os.path.exists(LOANS_CSV_PATH):
-        try:
-            loans_df = pd.read_csv(LOANS_CSV_PATH)
+@njit(cache=True)
+def _interest_kernel(amount, rate, days):
+    """Vectorized calculate_interest over float64 amount/rate and int days arrays."""
+    return np.round((amount * rate / 100.0) * (days / 30.0), 2)
+
+def _to_epoch_days(dates):
+    """Convert a datetime Series to int32 days since EPOCH."""
+    return (dates - EPOCH).dt.days.astype("int32")
+
+def _add_date_columns(loans_df):
+    """Derive the datetime and ISO date string columns from the epoch days."""
+    loans_df["start_date_dt"] = EPOCH + pd.to_timedelta(loans_df["start_epoch"], unit="D")
+    loans_df["end_date_dt"] = EPOCH + pd.to_timedelta(loans_df["end_epoch"], unit="D")
+    loans_df["start_date"] = loans_df["start_date_dt"].dt.strftime('%Y-%m-%d')
+    loans_df["end_date"] = loans_df["end_date_dt"].dt.strftime('%Y-%m-%d')
+    return loans_df
+
+def _append_part_paths():
+    """List the appended part files in the order they were written."""
+    if not os.path.isdir(LOANS_APPEND_DIR):
+        return []
+    return [
+        os.path.join(LOANS_APPEND_DIR, name)
+        for name in sorted(os.listdir(LOANS_APPEND_DIR))
+        if name.endswith(".parquet")
+    ]
+
+def _folded_part_names(path):
+    """Names of the appended part files already folded into the Parquet store."""
+    metadata = pq.read_schema(path).metadata or {}
+    return set(json.loads(metadata.get(FOLDED_PARTS_KEY, b"[]")))
+
+@st.cache_data
+def _load_cached(path, mtime):
+    """Read the loans Parquet store; cached per file path and modification times."""
+    loans_df = pd.read_parquet(path, engine="pyarrow")
+    
+    # Files written before the switch to epoch days hold ISO date strings
+    if "start_epoch" not in loans_df.columns:
+        loans_df["start_epoch"] = _to_epoch_days(pd.to_datetime(loans_df["start_date"], format='%Y-%m-%d'))
+        loans_df["end_epoch"] = _to_epoch_days(pd.to_datetime(loans_df["end_date"], format='%Y-%m-%d'))
+    
+    # Loans appended since the last full rewrite; parts the rewrite already
+    # folded in are skipped even if removing them afterwards failed
+    folded = _folded_part_names(path)
+    parts = [
+        pd.read_parquet(part_path, engine="pyarrow")
+        for part_path in _append_part_paths()
+        if os.path.basename(part_path) not in folded
+    ]
+    if parts:
+        loans_df = pd.concat([loans_df[STORED_COLUMNS]] + parts, ignore_index=True)
+    
+    return _index_by_id(_add_date_columns(loans_df))
+
+def _store_mtime():
+    """Modification times of the Parquet file and the appended parts directory."""
+    append_mtime = os.path.getmtime(LOANS_APPEND_DIR) if os.path.isdir(LOANS_APPEND_DIR) else None
+    return os.path.getmtime(LOANS_PARQUET_PATH), append_mtime
+
+def _index_by_id(loans_df):
+    """Index the loans frame by loan id, keeping id as a column too."""
+    return loans_df.set_index("id", drop=False).rename_axis(None)
+
+def _read_legacy_csv(path):
+    """Read a loans CSV written by earlier versions of the app."""
+    # Skip the old *_dt columns and declare dtypes so nothing has to be inferred
+    loans_df = pd.read_csv(
+        path,
+        usecols=["id", "person", "amount", "rate", "start_date", "end_date", "days", "interest", "total"],
+        dtype={
+            "id": "string", "person": "string", "amount": "float64", "rate": "float64",
+            "start_date": "string", "end_date": "string", "days": "int32",
+            "interest": "float64", "total": "float64"
+        },
+        engine="c"
+    )
+    
+    loans_df["start_epoch"] = _to_epoch_days(pd.to_datetime(loans_df["start_date"], format='%Y-%m-%d'))
+    loans_df["end_epoch"] = _to_epoch_days(pd.to_datetime(loans_df["end_date"], format='%Y-%m-%d'))
+    return loans_df
+
+def _write_parquet_file(loans_df, path, folded_parts=()):
+    """Write the stored columns of a loans frame via a temp file and atomic rename."""
+    tmp_path = path + ".tmp"
+    table = pa.Table.from_pandas(
+        loans_df[STORED_COLUMNS].astype({"start_epoch": "int32", "end_epoch": "int32"}),
+        preserve_index=False,
+    )
+    if folded_parts:
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), FOLDED_PARTS_KEY: json.dumps(list(folded_parts)).encode()}
+        )
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+def _write_parquet(loans_df):
+    """Rewrite the whole Parquet store, folding in any appended parts."""
+    # The rewrite records which parts it folded in before they are removed, so
+    # the swap is atomic; a failed removal propagates to the caller
+    part_paths = _append_part_paths()
+    _write_parquet_file(loans_df, LOANS_PARQUET_PATH, [os.path.basename(p) for p in part_paths])
+    for part_path in part_paths:
+        os.remove(part_path)
+
+def _append_parquet(loans_df):
+    """Write newly added loans as a new part file next to the Parquet store."""
+    os.makedirs(LOANS_APPEND_DIR, exist_ok=True)
+    _write_parquet_file(loans_df, os.path.join(LOANS_APPEND_DIR, f"{time.time_ns():020d}.parquet"))
+
+def load_loans():
+    """Load loans from the Parquet file, migrating an old CSV file if needed."""
+    try:
+        # One-shot migration from the old CSV store
+        if not os.path.exists(LOANS_PARQUET_PATH) and os.path.exists(LOANS_CSV_PATH):
+            _write_parquet(_read_legacy_csv(LOANS_CSV_PATH))
+        
+        if os.path.exists(LOANS_PARQUET_PATH):
+            # The mtimes are part of the cache key so rewritten or appended files are read again
+            loans_df = _load_cached(LOANS_PARQUET_PATH, _store_mtime())
             
-            # Convert date strings back to datetime objects for calculations
-            if not loans_df.empty:
-                loans_df["start_date_dt"] = pd.to_datetime(loans_df["start_date"])
-                loans_df["end_date_dt"] = pd.to_datetime(loans_df["end_date"])
-                
-                # Convert DataFrame to list of dictionaries
-                loans = loans_df.to_dict('records')
-                return loans
-        except Exception as e:
-            st.error(f"Error loading loans: {e}")
-    
-    return []
-
-def save_loans_to_csv(loans):
-    """Save loans to CSV file."""
-    if loans:
-        try:
-            loans_df = pd.DataFrame(loans)
-            loans_df.to_csv(LOANS_CSV_PATH, index=False)
-            return True
-        except Exception as e:
-            st.error(f"Error saving loans: {e}")
-            return False
-    return False
+            return loans_df
+    except Exception as e:
+        st.error(f"Error loading loans: {e}")
+    
+    return _index_by_id(pd.DataFrame(columns=STORED_COLUMNS + DATE_COLUMNS))
+
+def save_loans(loans_df):
+    """Save the loans frame to the Parquet file."""
+    try:
+        _write_parquet(loans_df)
+        return True
+    except Exception as e:
+        st.error(f"Error saving loans: {e}")
+        return False
+
+def save_new_loans(new_loans_df):
+    """Append newly added loans to the Parquet store without rewriting it."""
+    try:
+        _append_parquet(new_loans_df)
+        return True
+    except Exception as e:
+        st.error(f"Error saving loans: {e}")
+        return False
+
+def to_csv_bytes(df):
+    """Serialize a frame to UTF-8 CSV bytes for download."""
+    # Arrow writes UTF-8 straight from its buffers, skipping the str round-trip
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(
+        pa.Table.from_pandas(df, preserve_index=False),
+        buf,
+        pacsv.WriteOptions(quoting_style="needed")
+    )
+    return buf.getvalue().to_pybytes()
+
+def mark_loans_changed():
+    """Record a change to the loans so the grid is reset and the file is saved."""
+    st.session_state.loans_version += 1
+    st.session_state.dirty = True
+
+def mark_loans_added(loan_ids):
+    """Record newly added loans so only they are appended on the next save."""
+    st.session_state.loans_version += 1
+    st.session_state.added_loan_ids.extend(loan_ids)
+
+def get_editor_frame():
+    """Return the loans grid's input frame, rebuilt only after the loans change."""
+    if st.session_state.get('editor_df_version') != st.session_state.loans_version:
+        loans_df = st.session_state.loans_df
+        st.session_state.editor_df = loans_df[["id"] + DISPLAY_COLUMNS].assign(
+            start_date=loans_df["start_date_dt"].dt.date,
+            end_date=loans_df["end_date_dt"].dt.date
+        ).reset_index(drop=True)
+        st.session_state.editor_df_version = st.session_state.loans_version
+    return st.session_state.editor_df
+
+def get_person_categories():
+    """Return the loans' person column as a categorical, rebuilt only after the loans change."""
+    # The session frame keeps person as plain strings so the grid can edit it
+    if st.session_state.get('persons_version') != st.session_state.loans_version:
+        st.session_state.persons = st.session_state.loans_df["person"].astype("category")
+        st.session_state.persons_version = st.session_state.loans_version
+    return st.session_state.persons
+
+def persist_loans():
+    """Write the loans to disk if they changed since the last save."""
+    # Edits and deletes need a full rewrite, which also covers any added loans
+    if st.session_state.dirty or (st.session_state.added_loan_ids and not os.path.exists(LOANS_PARQUET_PATH)):
+        if save_loans(st.session_state.loans_df):
+            st.session_state.dirty = False
+            st.session_state.added_loan_ids = []
+    elif st.session_state.added_loan_ids:
+        if save_new_loans(st.session_state.loans_df.loc[st.session_state.added_loan_ids]):
+            st.session_state.added_loan_ids = []
+
+def append_loans(loans_df, loans):
+    """Return loans_df with the given loan records appended."""
+    new_df = _index_by_id(pd.DataFrame(loans))
+    if loans_df.empty:
+        return new_df
+    return pd.concat([loans_df, new_df])
+
+def new_loan_id():
+    """Generate a random 12-character hex id for a new loan."""
+    return secrets.token_hex(6)
+
+def make_loan(loan_id, person, amount, rate, start_date, end_date):
+    """Build a loan record with its derived days, interest and total."""
+    # Create datetime objects for calculation and ISO date strings for display
+    start_date_dt = pd.Timestamp(start_date)
+    end_date_dt = pd.Timestamp(end_date)
+    
+    # Calculate derived values
+    interest, days = calculate_interest(amount, rate, start_date_dt, end_date_dt)
+    
+    return {
+        "id": loan_id,
+        "person": person,
+        "amount": amount,
+        "rate": rate,
+        "start_epoch": (start_date_dt - EPOCH).days,
+        "end_epoch": (end_date_dt - EPOCH).days,
+        "start_date": start_date_dt.isoformat()[:10],
+        "end_date": end_date_dt.isoformat()[:10],
+        "start_date_dt": start_date_dt,
+        "end_date_dt": end_date_dt,
+        "days": days,
+        "interest": interest,
+        "total": amount + interest
+    }
+
+def _row_is_complete(row):
+    """Check that a loans grid row has every field needed to build a loan."""
+    return (
+        pd.notna(row["person"]) and str(row["person"]).strip() != ""
+        and pd.notna(row["amount"]) and row["amount"] > 0
+        and pd.notna(row["rate"])
+        and pd.notna(row["start_date"]) and pd.notna(row["end_date"])
+    )
+
+def apply_loan_edits(loans_df, original_df, edited_df):
+    """Apply rows edited, added or deleted in the loans grid to loans_df.
+    
+    Rows are matched on the hidden id column and looked up through the id
+    index of loans_df; added rows have no id yet.
+    Incomplete rows are skipped. Returns the updated frame, whether any
+    loan changed and how many rows were skipped.
+    """
+    original_df = original_df.set_index("id")
+    edited_df = edited_df.set_index("id")
+    changed = False
+    skipped = 0
+    
+    # Rows removed from the grid
+    deleted = original_df.index.difference(edited_df.index)
+    if len(deleted):
+        loans_df = loans_df.drop(index=deleted)
+        changed = True
+    
+    # Existing rows with at least one edited cell
+    kept = original_df.index.intersection(edited_df.index)
+    edited_mask = edited_df.loc[kept, EDITABLE_COLUMNS].ne(original_df.loc[kept, EDITABLE_COLUMNS]).any(axis=1)
+    for loan_id, row in edited_df.loc[kept[edited_mask.to_numpy()]].iterrows():
+        if _row_is_complete(row):
+            loans_df.loc[loan_id] = pd.Series(make_loan(
+                loan_id, row["person"], float(row["amount"]), float(row["rate"]),
+                row["start_date"], row["end_date"]
+            ))
+            changed = True
+        else:
+            skipped += 1
+    
+    # Rows added at the bottom of the grid
+    added_rows = edited_df[edited_df.index.isna()]
+    added = [
+        make_loan(
+            new_loan_id(), row["person"], float(row["amount"]), float(row["rate"]),
+            row["start_date"], row["end_date"]
+        )
+        for _, row in added_rows.iterrows()
+        if _row_is_complete(row)
+    ]
+    skipped += len(added_rows) - len(added)
+    if added:
+        loans_df = append_loans(loans_df, added)
+        changed = True
+    
+    return loans_df, changed, skipped
+
+def _hash_frame(df):
+    """Hash a frame's labels and full contents for st.cache_data keys."""
+    return tuple(df.columns), pd.util.hash_pandas_object(df, index=True).values.tobytes()
+
+# Hash frames in full instead of letting Streamlit sample large ones
+FRAME_HASH_FUNCS = {pd.DataFrame: _hash_frame}
+
+@st.cache_data(hash_funcs=FRAME_HASH_FUNCS)
+def build_pie(person_summary):
+    """Pie chart for amount distribution by person."""
+    return px.pie(
+        person_summary,
+        values="Total Receivable",
+        names="Person",
+        title="Amount Receivable by Person (%)",
+        hover_data=["Percentage (%)"]
+    )
+
+@st.cache_data(hash_funcs=FRAME_HASH_FUNCS)
+def build_stacked_bar(person_summary):
+    """Stacked bar chart showing principal vs interest by person."""
+    # One trace per component with all people in each
+    fig_bar = go.Figure(data=[
+        go.Bar(
+            name="Principal",
+            x=person_summary["Person"],
+            y=person_summary["Amount Lent"],
+            marker_color='blue'
+        ),
+        go.Bar(
+            name="Interest",
+            x=person_summary["Person"],
+            y=person_summary["Interest"],
+            marker_color='red'
+        )
+    ])
+    
+    fig_bar.update_layout(
+        title="Principal vs Interest by Person",
+        barmode='stack',
+        uirevision="stable"
+    )
+    return fig_bar
+
+@st.cache_data(hash_funcs=FRAME_HASH_FUNCS)
+def build_monthly_bar(monthly_summary):
+    """Stacked bar chart of amount and interest lent per month."""
+    return px.bar(
+        monthly_summary,
+        x="month",
+        y=["amount", "interest"],
+        title="Monthly Loan Distribution",
+        labels={"value": "Amount", "month": "Month"},
+        barmode="stack"
+    )
+
+@st.cache_data(hash_funcs=FRAME_HASH_FUNCS)
+def generate_combined_report(loans_df):
+    """Build the combined report summaries and CSV; cached per loans data."""
+    # Summary statistics in a single aggregation
+    stats = loans_df.agg({"amount": "sum", "interest": "sum", "total": "sum", "rate": "mean"})
+    
+    # Breakdown by person
+    person_summary = loans_df.groupby("person").agg({
+        "amount": "sum",
+        "interest": "sum",
+        "total": "sum"
+    }).reset_index()
+    
+    person_summary["percentage"] = (person_summary["total"] / person_summary["total"].sum() * 100).round(2)
+    person_summary.columns = ["Person", "Amount Lent", "Interest", "Total Receivable", "Percentage (%)"]
+    
+    # Loan distribution by month
+    loans_by_month = loans_df.copy()
+    loans_by_month["month"] = loans_by_month["start_date_dt"].dt.to_period("M")
+    monthly_summary = loans_by_month.groupby("month").agg({
+        "amount": "sum",
+        "interest": "sum"
+    }).reset_index()
+    
+    # Periods group in chronological order; format only the labels
+    monthly_summary["month"] = monthly_summary["month"].dt.strftime('%b %Y')
+    
+    return stats, person_summary, monthly_summary, to_csv_bytes(loans_df[DISPLAY_COLUMNS])
+
+@st.cache_data(hash_funcs=FRAME_HASH_FUNCS)
+def generate_individual_report(person_loans):
+    """Build one person's report summary, figures and CSV; cached per loans data."""
+    # Calculate summary statistics in a single aggregation
+    stats = person_loans.agg({"amount": "sum", "interest": "sum", "total": "sum", "rate": "mean"})
+    
+    # Create pie chart
+    fig_pie = px.pie(
+        values=[stats["amount"], stats["interest"]],
+        names=["Principal", "Interest"],
+        title="Principal vs Interest"
+    )
+    
+    # Create bar chart for individual loans
+    fig_bar = px.bar(
+        person_loans,
+        x="start_date",
+        y=["amount", "interest"],
+        title="Loans and Interest by Date",
+        labels={"value": "Amount", "start_date": "Loan Date"},
+        barmode="stack"
+    )
+    
+    return stats, fig_pie, fig_bar, to_csv_bytes(person_loans[DISPLAY_COLUMNS])
+
+@st.fragment
+def combined_report_section():
+    """Render the combined report; reruns alone when its button is clicked."""
+    # Generate Combined Report Button
+    if st.button("Generate Combined Report"):
+        st.subheader("Combined Loan Report")
+        
+        # Update calculated fields for all loans in one vectorized pass,
+        # using the current date for the latest calculations
+        loans_df = st.session_state.loans_df
+        today_epoch = (pd.Timestamp(datetime.now().date()) - EPOCH).days
+        days = today_epoch - loans_df["start_epoch"].to_numpy(dtype=np.int64)
+        interest = _interest_kernel(
+            loans_df["amount"].to_numpy(dtype=np.float64),
+            loans_df["rate"].to_numpy(dtype=np.float64),
+            days
+        )
+        loans_df["days"] = days
+        loans_df["interest"] = interest
+        loans_df["total"] = loans_df["amount"].to_numpy() + interest
+        
+        # Save updated calculations; a fragment rerun skips the save at the end of main.
+        # Only read-only columns changed, so the grid keeps its key and picks up
+        # the new values on the next full rerun
+        st.session_state.dirty = True
+        st.session_state.editor_df_version = None
+        persist_loans()
+        
+        stats, person_summary, monthly_summary, csv_bytes = generate_combined_report(loans_df)
+        total_loans = len(loans_df)
+        
+        # Summary metrics
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Loans", f"{total_loans}")
+        with col2:
+            st.metric("Total Amount Lent", f"₹{stats['amount']:,.2f}")
+        with col3:
+            st.metric("Total Interest", f"₹{stats['interest']:,.2f}")
+        with col4:
+            st.metric("Total Receivable", f"₹{stats['total']:,.2f}")
+        
+        st.write(f"Average Interest Rate: {stats['rate']:.2f}% per month")
+        
+        # Breakdown by person
+        st.subheader("Breakdown by Person")
+        st.dataframe(person_summary)
+        
+        # Visualizations for combined report
+        st.subheader("Visualizations")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.plotly_chart(build_pie(person_summary))
+        
+        with col2:
+            st.plotly_chart(build_stacked_bar(person_summary))
+        
+        st.plotly_chart(build_monthly_bar(monthly_summary), use_container_width=True)
+        
+        # Download option for combined report
+        st.download_button(
+            "Download Combined Report as CSV",
+            csv_bytes,
+            f"combined_loan_report_{datetime.now().strftime('%Y%m%d')}.csv",
+            "text/csv",
+            key="download-combined-csv"
+        )
+
+@st.fragment
+def individual_report_section():
+    """Render the individual report; reruns alone when its widgets change."""
+    loans_df = st.session_state.loans_df
+    
+    # Individual report section
+    st.subheader("Generate Individual Report")
+    
+    # unique() and the filter below work on the cached categorical's codes
+    persons = get_person_categories()
+    people = persons.unique().astype(str)
+    selected_person = st.selectbox("Select Person for Report", people)
+    
+    if st.button("Generate Individual Report"):
+        person_loans = loans_df[persons == selected_person]
+        stats, fig_pie, fig_bar, csv_bytes = generate_individual_report(person_loans)
+        
+        # Create report
+        st.subheader(f"Loan Report for {selected_person}")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Amount Lent", f"₹{stats['amount']:,.2f}")
+        with col2:
+            st.metric("Total Interest", f"₹{stats['interest']:,.2f}")
+        with col3:
+            st.metric("Total Receivable", f"₹{stats['total']:,.2f}")
+        
+        st.write(f"Average Interest Rate: {stats['rate']:.2f}% per month")
+        
+        # Detailed breakdown
+        st.subheader("Detailed Breakdown")
+        st.dataframe(person_loans[DISPLAY_COLUMNS], hide_index=True)
+        
+        # Visualizations
+        st.subheader("Visualizations")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.plotly_chart(fig_pie)
+        
+        with col2:
+            st.plotly_chart(fig_bar)
+        
+        # Export option
+        st.download_button(
+            "Download Report as CSV",
+            csv_bytes,
+            f"loan_report_{selected_person}_{datetime.now().strftime('%Y%m%d')}.csv",
+            "text/csv",
+            key="download-csv"
+        )
 
 def main():
     st.set_page_config(page_title="Loan Tracker", layout="wide")
@@ -52,346 +582,110 @@ def main():
     st.title("Loan Tracker Application")
     st.write("Track loans with varying interest rates and generate reports.")
     
-    # Initialize session state for tracking loans
-    if 'loans' not in st.session_state:
-        st.session_state.loans = load_loans_from_csv()
+    # Initialize session state for tracking loans, kept as a single DataFrame
+    # indexed by loan id; the index only changes when the loans do
+    if 'loans_df' not in st.session_state:
+        st.session_state.loans_df = load_loans()
+    
+    # Mutations only mark the loans as dirty; they are written once per run
+    if 'dirty' not in st.session_state:
+        st.session_state.dirty = False
+    
+    # Loans added since the last save, which can be appended instead of rewritten
+    if 'added_loan_ids' not in st.session_state:
+        st.session_state.added_loan_ids = []
+    
+    # Bumped on every mutation so the loans grid starts from fresh data
+    if 'loans_version' not in st.session_state:
+        st.session_state.loans_version = 0
     
-    # Track if we're editing a loan or adding a new one
-    if 'editing_loan' not in st.session_state:
-        st.session_state.editing_loan = None
-        
     # Loan entry form
     with st.form("loan_entry_form"):
-        if st.session_state.editing_loan:
-            st.subheader(f"Edit Loan for {st.session_state.editing_loan['person']}")
-            loan_to_edit = st.session_state.editing_loan
-            form_id = loan_to_edit['id']
-        else:
-            st.subheader("Add New Loan")
-            form_id = None
-            loan_to_edit = {"person": "", "amount": 10000.0, "rate": 1.5, 
-                           "start_date": datetime.now().strftime('%Y-%m-%d'), 
-                           "end_date": datetime.now().strftime('%Y-%m-%d')}
+        st.subheader("Add New Loan")
         
         col1, col2 = st.columns(2)
         
         with col1:
-            person_name = st.text_input("Person's Name", value=loan_to_edit["person"])
-            loan_amount = st.number_input("Loan Amount", min_value=0.0, value=float(loan_to_edit["amount"]), step=1000.0)
+            person_name = st.text_input("Person's Name")
+            loan_amount = st.number_input("Loan Amount", min_value=0.0, value=10000.0, step=1000.0)
             interest_rate = st.number_input("Monthly Interest Rate (%)", min_value=0.0, max_value=10.0, 
-                                          value=float(loan_to_edit["rate"]), step=0.1)
+                                          value=1.5, step=0.1)
         
         with col2:
-            loan_date = st.date_input("Loan Date", value=pd.to_datetime(loan_to_edit["start_date"]))
-            end_date = st.date_input("End Date (for calculation)", value=pd.to_datetime(loan_to_edit["end_date"]))
+            loan_date = st.date_input("Loan Date", value=datetime.now())
+            end_date = st.date_input("End Date (for calculation)", value=datetime.now())
             st.write("Use today's date for ongoing loans")
         
-        if st.session_state.editing_loan:
-            submit_button = st.form_submit_button("Update Loan")
-        else:
-            submit_button = st.form_submit_button("Add Loan")
+        submit_button = st.form_submit_button("Add Loan")
         
         if submit_button:
             if person_name and loan_amount > 0:
-                # Convert to datetime objects first, then to strings with a specific format
-                start_date_str = pd.to_datetime(loan_date).strftime('%Y-%m-%d')
-                end_date_str = pd.to_datetime(end_date).strftime('%Y-%m-%d')
-                
-                # Create datetime objects for calculation
-                start_date_dt = pd.to_datetime(start_date_str)
-                end_date_dt = pd.to_datetime(end_date_str)
-                
-                # Calculate derived values
-                interest, days = calculate_interest(
-                    loan_amount, 
-                    interest_rate, 
-                    start_date_dt, 
-                    end_date_dt
-                )
-                
-                # Create/update loan info
-                loan_info = {
-                    "id": form_id if form_id else str(uuid.uuid4()),  # Use existing ID or generate new one
-                    "person": person_name,
-                    "amount": loan_amount,
-                    "rate": interest_rate,
-                    "start_date": start_date_str,
-                    "end_date": end_date_str,
-                    "start_date_dt": start_date_dt,
-                    "end_date_dt": end_date_dt,
-                    "days": days,
-                    "interest": interest,
-                    "total": loan_amount + interest
-                }
-                
-                if st.session_state.editing_loan:
-                    # Find and replace the existing loan
-                    for i, loan in enumerate(st.session_state.loans):
-                        if loan['id'] == form_id:
-                            st.session_state.loans[i] = loan_info
-                            save_loans_to_csv(st.session_state.loans)
-                            st.success(f"Loan to {person_name} updated successfully!")
-                            break
-                    st.session_state.editing_loan = None  # Reset editing state
-                else:
-                    # Add new loan
-                    st.session_state.loans.append(loan_info)
-                    save_loans_to_csv(st.session_state.loans)
-                    st.success(f"Loan of {loan_amount} to {person_name} added successfully!")
+                # Add new loan
+                loan_info = make_loan(new_loan_id(), person_name, loan_amount, interest_rate, loan_date, end_date)
+                st.session_state.loans_df = append_loans(st.session_state.loans_df, [loan_info])
+                mark_loans_added([loan_info['id']])
+                st.success(f"Loan of {loan_amount} to {person_name} added successfully!")
             else:
                 st.error("Please fill in all required fields")
     
-    # Cancel editing button (outside the form)
-    if st.session_state.editing_loan:
-        if st.button("Cancel Editing"):
-            st.session_state.editing_loan = None
-            st.rerun()
-    
     # Display current loans
-    if st.session_state.loans:
+    if not st.session_state.loans_df.empty:
         st.subheader("Current Loans")
         
-        loans_df = pd.DataFrame(st.session_state.loans)
+        loans_df = st.session_state.loans_df
         
-        # Use only the columns we need for display
-        display_columns = [
-            "person", "amount", "rate", "start_date", 
-            "end_date", "days", "interest", "total"
-        ]
+        # Edit, add or delete loans inline; derived columns are read-only
+        editor_df = get_editor_frame()
+        editor_key = f"loans_editor_{st.session_state.loans_version}"
         
-        # Make sure we have all required columns
-        for col in display_columns:
-            if col not in loans_df.columns:
-                if col == "days" or col == "interest" or col == "total":
-                    loans_df[col] = 0
-                else:
-                    loans_df[col] = ""
-        
-        # Add delete and edit buttons for each loan
-        col1, col2, col3 = st.columns([4, 1, 1])
-        with col1:
-            st.dataframe(loans_df[display_columns])
+        # The key changes with every mutation so applied edits are not replayed
+        edited_df = st.data_editor(
+            editor_df,
+            num_rows="dynamic",
+            hide_index=True,
+            disabled=["days", "interest", "total"],
+            column_config={
+                "id": None,
+                "person": st.column_config.TextColumn("Person", required=True),
+                "amount": st.column_config.NumberColumn("Amount", required=True, min_value=0.01, step=1000.0),
+                "rate": st.column_config.NumberColumn("Rate (%)", required=True, min_value=0.0, max_value=10.0, step=0.1),
+                "start_date": st.column_config.DateColumn("Start Date", required=True),
+                "end_date": st.column_config.DateColumn("End Date", required=True)
+            },
+            key=editor_key
+        )
         
-        with col2:
-            st.subheader("Edit Loans")
-            
-            # Create edit buttons for individual loans
-            for loan in st.session_state.loans:
-                if st.button(f"Edit {loan['person']}", key=f"edit_{loan['id']}"):
-                    st.session_state.editing_loan = loan
-                    st.rerun()
+        # Only diff the grid against the loans when the widget reports changes
+        editor_state = st.session_state.get(editor_key, {})
+        if editor_state.get("edited_rows") or editor_state.get("added_rows") or editor_state.get("deleted_rows"):
+            loans_df, changed, skipped = apply_loan_edits(loans_df, editor_df, edited_df)
+            if skipped:
+                # Kept in session state so it survives the rerun that resets the grid
+                st.session_state.editor_warning = (
+                    f"{skipped} loan row(s) were not saved. Please fill in all required fields "
+                    "with an amount above zero."
+                )
+            if changed:
+                st.session_state.loans_df = loans_df
+                mark_loans_changed()
+                st.rerun()
         
-        with col3:
-            st.subheader("Delete Loans")
-            
-            # Create delete buttons for individual loans
-            for index, loan in enumerate(st.session_state.loans):
-                if st.button(f"Delete {loan['person']}", key=f"del_{loan['id']}"):
-                    del st.session_state.loans[index]
-                    save_loans_to_csv(st.session_state.loans)
-                    st.success("Loan deleted successfully!")
-                    st.rerun()
+        if 'editor_warning' in st.session_state:
+            st.warning(st.session_state.pop('editor_warning'))
         
         # Option to remove all loans
         if st.button("Clear All Loans"):
-            st.session_state.loans = []
-            save_loans_to_csv(st.session_state.loans)
+            st.session_state.loans_df = loans_df.iloc[0:0]
+            mark_loans_changed()
             st.success("All loans cleared!")
             st.rerun()
         
-        # Generate Combined Report Button
-        if st.button("Generate Combined Report"):
-            st.subheader("Combined Loan Report")
-            
-            # Update calculated fields for all loans
-            for i, loan in enumerate(st.session_state.loans):
-                interest, days = calculate_interest(
-                    loan["amount"], 
-                    loan["rate"], 
-                    loan["start_date_dt"], 
-                    pd.to_datetime(datetime.now().strftime('%Y-%m-%d'))  # Use current date for latest calculations
-                )
-                st.session_state.loans[i]["days"] = days
-                st.session_state.loans[i]["interest"] = interest
-                st.session_state.loans[i]["total"] = loan["amount"] + interest
-            
-            # Save updated calculations to CSV
-            save_loans_to_csv(st.session_state.loans)
-            
-            # Create DataFrame from updated loans
-            loans_df = pd.DataFrame(st.session_state.loans)
-            
-            # Summary statistics
-            total_amount_lent = loans_df["amount"].sum()
-            total_interest = loans_df["interest"].sum()
-            total_receivable = loans_df["total"].sum()
-            avg_interest_rate = loans_df["rate"].mean()
-            total_loans = len(loans_df)
-            
-            # Summary metrics
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Loans", f"{total_loans}")
-            with col2:
-                st.metric("Total Amount Lent", f"₹{total_amount_lent:,.2f}")
-            with col3:
-                st.metric("Total Interest", f"₹{total_interest:,.2f}")
-            with col4:
-                st.metric("Total Receivable", f"₹{total_receivable:,.2f}")
-            
-            st.write(f"Average Interest Rate: {avg_interest_rate:.2f}% per month")
-            
-            # Breakdown by person
-            st.subheader("Breakdown by Person")
-            person_summary = loans_df.groupby("person").agg({
-                "amount": "sum",
-                "interest": "sum",
-                "total": "sum"
-            }).reset_index()
-            
-            person_summary["percentage"] = (person_summary["total"] / person_summary["total"].sum() * 100).round(2)
-            person_summary.columns = ["Person", "Amount Lent", "Interest", "Total Receivable", "Percentage (%)"]
-            
-            st.dataframe(person_summary)
-            
-            # Visualizations for combined report
-            st.subheader("Visualizations")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Pie chart for amount distribution by person
-                fig_pie = px.pie(
-                    person_summary,
-                    values="Total Receivable",
-                    names="Person",
-                    title="Amount Receivable by Person (%)",
-                    hover_data=["Percentage (%)"]
-                )
-                st.plotly_chart(fig_pie)
-            
-            with col2:
-                # Stacked bar chart showing principal vs interest by person
-                fig_bar = go.Figure()
-                for person in person_summary["Person"]:
-                    person_data = person_summary[person_summary["Person"] == person]
-                    principal = person_data["Amount Lent"].values[0]
-                    interest = person_data["Interest"].values[0]
-                    
-                    fig_bar.add_trace(go.Bar(
-                        name=f"{person} - Principal",
-                        x=[person],
-                        y=[principal],
-                        marker_color='blue'
-                    ))
-                    
-                    fig_bar.add_trace(go.Bar(
-                        name=f"{person} - Interest",
-                        x=[person],
-                        y=[interest],
-                        marker_color='red'
-                    ))
-                
-                fig_bar.update_layout(
-                    title="Principal vs Interest by Person",
-                    barmode='stack'
-                )
-                st.plotly_chart(fig_bar)
-            
-            # Loan distribution by month
-            loans_by_month = loans_df.copy()
-            loans_by_month["month"] = pd.to_datetime(loans_by_month["start_date"]).dt.strftime('%b %Y')
-            monthly_summary = loans_by_month.groupby("month").agg({
-                "amount": "sum",
-                "interest": "sum"
-            }).reset_index()
-            
-            fig_monthly = px.bar(
-                monthly_summary,
-                x="month",
-                y=["amount", "interest"],
-                title="Monthly Loan Distribution",
-                labels={"value": "Amount", "month": "Month"},
-                barmode="stack"
-            )
-            st.plotly_chart(fig_monthly, use_container_width=True)
-            
-            # Download option for combined report
-            st.download_button(
-                "Download Combined Report as CSV",
-                loans_df[display_columns].to_csv(index=False).encode('utf-8'),
-                f"combined_loan_report_{datetime.now().strftime('%Y%m%d')}.csv",
-                "text/csv",
-                key="download-combined-csv"
-            )
-        
-        # Individual report section
-        st.subheader("Generate Individual Report")
-        
-        # Group by person
-        people = loans_df["person"].unique()
-        selected_person = st.selectbox("Select Person for Report", people)
-        
-        if st.button("Generate Individual Report"):
-            person_loans = loans_df[loans_df["person"] == selected_person]
-            
-            # Calculate summary statistics
-            total_amount_lent = person_loans["amount"].sum()
-            total_interest = person_loans["interest"].sum()
-            total_receivable = person_loans["total"].sum()
-            avg_interest_rate = person_loans["rate"].mean()
-            
-            # Create report
-            st.subheader(f"Loan Report for {selected_person}")
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Amount Lent", f"₹{total_amount_lent:,.2f}")
-            with col2:
-                st.metric("Total Interest", f"₹{total_interest:,.2f}")
-            with col3:
-                st.metric("Total Receivable", f"₹{total_receivable:,.2f}")
-            
-            st.write(f"Average Interest Rate: {avg_interest_rate:.2f}% per month")
-            
-            # Detailed breakdown
-            st.subheader("Detailed Breakdown")
-            st.dataframe(person_loans[display_columns])
-            
-            # Visualizations
-            st.subheader("Visualizations")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Create pie chart
-                fig_pie = px.pie(
-                    values=[total_amount_lent, total_interest],
-                    names=["Principal", "Interest"],
-                    title="Principal vs Interest"
-                )
-                st.plotly_chart(fig_pie)
-            
-            with col2:
-                # Create bar chart for individual loans
-                fig_bar = px.bar(
-                    person_loans,
-                    x="start_date",
-                    y=["amount", "interest"],
-                    title="Loans and Interest by Date",
-                    labels={"value": "Amount", "start_date": "Loan Date"},
-                    barmode="stack"
-                )
-                st.plotly_chart(fig_bar)
-            
-            # Export option
-            st.download_button(
-                "Download Report as CSV",
-                person_loans[display_columns].to_csv(index=False).encode('utf-8'),
-                f"loan_report_{selected_person}_{datetime.now().strftime('%Y%m%d')}.csv",
-                "text/csv",
-                key="download-csv"
-            )
+        # Reports rerun on their own when their widgets change
+        combined_report_section()
+        individual_report_section()
+    
+    # Persist any changes made during this run in a single write
+    persist_loans()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file